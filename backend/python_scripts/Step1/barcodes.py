@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+
+"""
+Barcode CSV loader shared by rename_trim.py and species_detector.py.
+
+Row format: location,<unused>,<unused>,barcode_f,primer_f,barcode_r,primer_r
+The species prefix of a location is the part before its first '_'.
+"""
+
+import csv
+from typing import List, Tuple
+
+
+def species_prefix(location: str) -> str:
+    """Extract the species prefix from a location name (species_location)."""
+    return location.split('_', 1)[0]
+
+
+def load_barcodes(barcode_file: str) -> List[Tuple[str, str, List[str]]]:
+    """
+    Parse a barcode CSV file in a single csv.reader pass.
+    Returns (location, species_prefix, [barcode_f, primer_f, barcode_r, primer_r])
+    for every row with at least 7 fields, in file order; blank and short rows
+    are skipped. Surrounding whitespace is stripped from every field.
+    """
+    rows = []
+    with open(barcode_file, 'r', encoding='utf-8', newline='') as f:
+        for row in csv.reader(f):
+            if len(row) >= 7:
+                location = row[0].strip()
+                rows.append((location, species_prefix(location), [field.strip() for field in row[3:7]]))
+    return rows
+
+
+def detect_species(barcode_file: str) -> List[str]:
+    """Return the sorted species prefixes present in a barcode CSV file."""
+    return sorted({species for _, species, _ in load_barcodes(barcode_file)})
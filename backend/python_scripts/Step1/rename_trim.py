@@ -5,84 +5,45 @@ Rename and trim DNA Analysis Pipeline
 Combines rename and trim operations for paired-end sequencing data.
 Modified to output only the species specified in quality_config_file.
 
-Usage: python rename_trim.py <R1_fastq> <R2_fastq> <barcode_csv> <quality_config_json>
+Usage: python rename_trim.py <R1_fastq> <R2_fastq> <barcode_csv> <quality_config_json> [--verbose]
 
 Flow:
-1. Rename R1 reads → temp files
-2. Rename R2 reads → temp files
-3. Trim paired reads using barcode file → outputs/
-4. Output ONLY the selected species files with custom quality standards
+1. Stream R1/R2 reads in pairs, renaming them by position (no temp files)
+2. Trim paired reads using barcode file → outputs/
+3. Output ONLY the selected species files with custom quality standards
 """
 
 import sys
 import os
 import json
+import mmap
 from pathlib import Path
-from collections import defaultdict
-from typing import Dict, List, Tuple, Optional, TextIO
+from collections import defaultdict, deque
+from itertools import chain, islice
+from concurrent.futures import ProcessPoolExecutor
+from typing import BinaryIO, Dict, Iterator, List, Tuple, Optional
 
-sys.stdout = os.fdopen(sys.stdout.fileno(), 'w', 1)  # 行緩衝
-sys.stderr = os.fdopen(sys.stderr.fileno(), 'w', 1)  # 行緩衝
+from barcodes import load_barcodes
 
 
-def rename_fastq_file(input_file: str, output_file: str) -> None:
+class ReadBatch:
     """
-    Rename reads in a FASTQ file by file name using read counts.
+    A batch of paired reads stored column-wise (SoA): one list per field
+    instead of one object per read. Row i of every list is read start + i.
     """
-    print(f"Renaming reads in: {input_file}", flush=True)
     
-    # Ensure output directory exists
-    output_dir = os.path.dirname(output_file)
-    if output_dir:
-        os.makedirs(output_dir, exist_ok=True)
+    __slots__ = ('start', 'r1_seqs', 'r1_quals', 'r2_seqs', 'r2_quals')
     
-    # Extract pair identifier (R1 or R2)
-    filename = Path(input_file).name
-    if '_R1' in filename:
-        pair = 'R1'
-    elif '_R2' in filename:
-        pair = 'R2'
-    else:
-        # Fallback to last part before extension
-        pair = filename.split('_')[-1][0:2]
+    def __init__(self, start: int, r1_seqs: List[bytes], r1_quals: List[bytes],
+                 r2_seqs: List[bytes], r2_quals: List[bytes]):
+        self.start = start
+        self.r1_seqs = r1_seqs
+        self.r1_quals = r1_quals
+        self.r2_seqs = r2_seqs
+        self.r2_quals = r2_quals
     
-    read_counts = 0
-    
-    with open(output_file, 'w') as outfile:
-        with open(input_file, 'r') as infile:
-            for i, line in enumerate(infile):
-                line = line.rstrip()
-                if i % 4 == 0:  # Header line
-                    outfile.write("@" + pair + "_" + str(read_counts))
-                    outfile.write("\n")
-                    read_counts += 1
-                else:
-                    outfile.write(line)
-                    outfile.write("\n")
-    
-    print(f"Renamed {read_counts} reads. Output: {output_file}", flush=True)
-
-
-class FastqRecord:
-    """Represents a single FASTQ record with header, sequence, and quality."""
-    
-    def __init__(self, header: str, sequence: str, quality: str):
-        self.header = header
-        self.sequence = sequence
-        self.quality = quality
-        self.index = self._extract_index()
-    
-    def _extract_index(self) -> str:
-        """Extract read index from header."""
-        return self.header.split('_')[1] if '_' in self.header else ""
-    
-    def trim_sequence(self, trim_length: int) -> 'FastqRecord':
-        """Return a new FastqRecord with trimmed sequence and quality."""
-        return FastqRecord(
-            self.header,
-            self.sequence[trim_length:],
-            self.quality[trim_length:]
-        )
+    def __len__(self) -> int:
+        return len(self.r1_seqs)
 
 
 class BarcodeDatabase:
@@ -90,6 +51,8 @@ class BarcodeDatabase:
     
     def __init__(self, tagfile: str, target_species: str):
         self.tags = {}
+        self.combined = {}  # location -> upper-case (barcode_f + primer_f, barcode_r + primer_r) bytes
+        self.location_to_species = {}
         self.target_species = target_species  # 新增：目標物種
         self.species_prefixes = set()
         self._load_tags(tagfile)
@@ -99,99 +62,163 @@ class BarcodeDatabase:
         print(f"Loading barcode file: {tagfile}", flush=True)
         print(f"Target species: {self.target_species}", flush=True)
         
-        total_entries = 0
+        entries = load_barcodes(tagfile)
+        total_entries = len(entries)
         filtered_entries = 0
         
-        with open(tagfile, 'r', encoding='utf-8') as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                    
-                fields = line.split(',')
-                if len(fields) >= 7:
-                    location = fields[0]
-                    total_entries += 1
-                    
-                    # Extract species prefix
-                    species_prefix = location.split('_')[0] if '_' in location else location
-                    
-                    # 只載入目標物種的條碼
-                    if species_prefix == self.target_species:
-                        # Store: barcode_f, primer_f, barcode_r, primer_r
-                        self.tags[location] = fields[3:7]
-                        self.species_prefixes.add(species_prefix)
-                        filtered_entries += 1
+        for location, species_prefix, tags in entries:
+            # 只載入目標物種的條碼
+            if species_prefix == self.target_species:
+                # Store: barcode_f, primer_f, barcode_r, primer_r
+                self.tags[location] = tags
+                self.combined[location] = ((tags[0] + tags[1]).upper().encode(),
+                                           (tags[2] + tags[3]).upper().encode())
+                self.location_to_species[location] = species_prefix
+                self.species_prefixes.add(species_prefix)
+                filtered_entries += 1
         
         print(f"Total entries in barcode file: {total_entries}", flush=True)
         print(f"Loaded {filtered_entries} entries for target species '{self.target_species}'", flush=True)
         
         if filtered_entries == 0:
             print(f"WARNING: No barcode entries found for species '{self.target_species}'", flush=True)
-    
-    def get_combined_tags(self, location: str) -> Tuple[str, str]:
-        """Get combined forward and reverse tags for a location."""
-        barcode_f, primer_f, barcode_r, primer_r = self.tags[location]
-        return barcode_f + primer_f, barcode_r + primer_r
+
+        self._pack_tags()
+
+    def _pack_tags(self) -> None:
+        """
+        Pack all combined tags into one big integer per role (SoA layout).
+
+        Every tag gets two lanes (one per orientation, R1f then R2f) of W bytes,
+        W being the smallest power of two >= L (L = longest tag): zero padding,
+        then the tag zero-padded to L. Any W consecutive bytes then hold at most
+        L tag bytes, so log2(W) shift-adds sum each lane into its last byte
+        without overflow, and all tags can be scored against a read pair at once.
+        """
+        self.locations = list(self.tags.keys())
+        self.tag_species = [self.location_to_species[location] for location in self.locations]
+        # (tag_f, tag_r, len_tag_f, len_tag_r) per tag, in load order
+        self.combined_list = [(tag_f, tag_r, len(tag_f), len(tag_r))
+                              for tag_f, tag_r in map(self.combined.__getitem__, self.locations)]
+
+        tags_f = [tag[0] for tag in self.combined_list]
+        tags_r = [tag[1] for tag in self.combined_list]
+        self.tag_f_lens = [tag[2] for tag in self.combined_list]
+        self.tag_r_lens = [tag[3] for tag in self.combined_list]
+
+        self.max_tag_len = lane_len = max(self.tag_f_lens + self.tag_r_lens, default=0)
+        # Lane sums of f + r mismatches must fit in a single byte
+        self.packed = 0 < 2 * lane_len < 256
+        if not self.packed:
+            return
+
+        self.lane_len = lane_len
+        self.lane_width = 1 << (lane_len - 1).bit_length()
+        self.lane_pad = b'\x00' * (self.lane_width - lane_len)
+        self.lane_shifts = tuple(8 << step for step in range(self.lane_width.bit_length() - 1))
+        self.lane_mask = (1 << (8 * self.lane_width)) - 1
+        self.num_lanes = 2 * len(self.locations)
+        self.table_size = self.lane_width * self.num_lanes
+
+        def pack(tags: List[bytes]) -> Tuple[int, int]:
+            lanes = b''.join((self.lane_pad + tag.ljust(lane_len, b'\x00')) * 2 for tag in tags)
+            mask = b''.join((self.lane_pad + (b'\x01' * len(tag)).ljust(lane_len, b'\x00')) * 2 for tag in tags)
+            return int.from_bytes(lanes, 'big'), int.from_bytes(mask, 'big')
+
+        self.tag_f_lanes, self.tag_f_mask = pack(tags_f)
+        self.tag_r_lanes, self.tag_r_mask = pack(tags_r)
 
 
 class FastqProcessor:
-    """Processes paired-end FASTQ files."""
+    """Streams paired-end FASTQ files."""
     
     def __init__(self, r1_file: str, r2_file: str):
         self.r1_file = r1_file
         self.r2_file = r2_file
-        self.paired_reads = {}
     
-    def load_reads(self) -> None:
-        """Load paired-end reads into memory."""
-        print("Loading R1 reads...", flush=True)
-        r1_reads = self._load_fastq_file(self.r1_file)
-        
-        print("Loading R2 reads...", flush=True)
-        r2_reads = self._load_fastq_file(self.r2_file)
-        
-        # Combine R1 and R2 reads
-        for index in r1_reads:
-            if index in r2_reads:
-                self.paired_reads[index] = (r1_reads[index], r2_reads[index])
+    def iter_batches(self, batch_size: int) -> Iterator[ReadBatch]:
+        """
+        Yield the paired reads in file order, batch_size pairs at a time.
         
-        print(f"Loaded {len(self.paired_reads)} paired reads", flush=True)
+        Reads are renamed on the fly: the read index is the position of the
+        pair in the input files, the same counter the rename step used to
+        write into the headers. Only one batch of reads is in memory at a time.
+        """
+        start = 0
+        for (r1_seqs, r1_quals), (r2_seqs, r2_quals) in zip(self._iter_columns(self.r1_file, batch_size),
+                                                            self._iter_columns(self.r2_file, batch_size)):
+            # Reads past the end of the shorter file have no mate
+            count = min(len(r1_seqs), len(r2_seqs))
+            del r1_seqs[count:], r1_quals[count:], r2_seqs[count:], r2_quals[count:]
+            yield ReadBatch(start, r1_seqs, r1_quals, r2_seqs, r2_quals)
+            start += count
     
-    def _load_fastq_file(self, filename: str) -> Dict[str, FastqRecord]:
-        """Load FASTQ file and return dictionary of reads indexed by read index."""
-        reads = {}
-        
-        with open(filename, 'r', encoding='utf-8') as f:
-            lines = [line.strip() for line in f]
-        
-        # Process FASTQ in chunks of 4 lines
-        for i in range(0, len(lines), 4):
-            if i + 3 < len(lines):
-                header = lines[i]
-                sequence = lines[i + 1]
-                quality = lines[i + 3]
+    @staticmethod
+    def _iter_columns(filename: str, batch_size: int) -> Iterator[Tuple[List[bytes], List[bytes]]]:
+        """Yield (sequences, qualities) of a FASTQ file batch by batch, reading it through an mmap."""
+        with open(filename, 'rb') as f:
+            # mmap cannot map an empty file; there are no reads to yield then
+            if not os.fstat(f.fileno()).st_size:
+                return
+            reader = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        
+        with reader:
+            readline = reader.readline
+            while True:
+                seqs = []
+                quals = []
+                append_seq = seqs.append
+                append_qual = quals.append
+                for _ in range(batch_size):
+                    readline()
+                    sequence = readline()
+                    readline()
+                    quality = readline()
+                    if not quality:
+                        break
+                    append_seq(sequence.rstrip(b'\r\n'))
+                    append_qual(quality.rstrip(b'\r\n'))
                 
-                record = FastqRecord(header, sequence, quality)
-                if record.index:
-                    reads[record.index] = record
-        
-        return reads
+                if seqs:
+                    yield seqs, quals
+                if len(seqs) < batch_size:
+                    return
 
 
 class SequenceMatcher:
     """Handles sequence matching and mismatch calculation."""
     
+    # 0x01 in every byte; covers sequences up to 1024 bases
+    LOW_BITS = int.from_bytes(b'\x01' * 1024, 'big')
+    
     @staticmethod
-    def hamming_distance(seq1: str, seq2: str) -> int:
-        """Calculate Hamming distance between two sequences of equal length."""
+    def hamming_distance(seq1: bytes, seq2: bytes) -> int:
+        """Calculate Hamming distance between two upper-case sequences of equal length."""
         if len(seq1) != len(seq2):
             return float('inf')
+        if seq1 == seq2:
+            return 0
         
-        return sum(c1 != c2 for c1, c2 in zip(seq1.upper(), seq2.upper()))
-    
+        # Compare 8 bases per machine word instead of one base per Python step
+        mask = SequenceMatcher.LOW_BITS if len(seq1) <= 1024 else int.from_bytes(b'\x01' * len(seq1), 'big')
+        diff = SequenceMatcher.lane_mismatches(int.from_bytes(seq1, 'big'), int.from_bytes(seq2, 'big'), mask)
+        return bin(diff).count('1')
+
     @staticmethod
-    def find_best_orientation(tag_f: str, tag_r: str, r1_seq: str, r2_seq: str) -> Tuple[str, int, int, int, int]:
+    def lane_mismatches(tag_lanes: int, read_lanes: int, mask: int) -> int:
+        """
+        Compare packed tags against a packed read in one pass.
+        Returns an integer with byte 0x01 wherever tag and read differ, 0x00 elsewhere.
+        """
+        diff = tag_lanes ^ read_lanes
+        # Fold every non-zero byte down to its lowest bit
+        diff |= diff >> 4
+        diff |= diff >> 2
+        diff |= diff >> 1
+        return diff & mask
+
+    @staticmethod
+    def find_best_orientation(tag_f: bytes, tag_r: bytes, r1_seq: bytes, r2_seq: bytes) -> Tuple[str, int, int, int, int]:
         """
         Find the best orientation for tag matching.
         Returns: (orientation, mismatch_f, mismatch_r, len_tag_f, len_tag_r)
@@ -203,6 +230,9 @@ class SequenceMatcher:
         mismatch_r1f = SequenceMatcher.hamming_distance(tag_f, r1_seq[:len_tag_f])
         mismatch_r2r = SequenceMatcher.hamming_distance(tag_r, r2_seq[:len_tag_r])
         r1f_total = mismatch_r1f + mismatch_r2r
+        # R1f wins ties, so a perfect R1f match cannot be beaten
+        if r1f_total == 0:
+            return "R1f", 0, 0, len_tag_f, len_tag_r
         
         # R2f + R1r orientation
         mismatch_r2f = SequenceMatcher.hamming_distance(tag_f, r2_seq[:len_tag_f])
@@ -215,9 +245,171 @@ class SequenceMatcher:
             return "R2f", mismatch_r2f, mismatch_r1r, len_tag_f, len_tag_r
 
 
+class BarcodeMatcher:
+    """Finds the best barcode/primer tag for batches of read pairs."""
+    
+    # Distinct read-prefix pairs remembered between batches
+    MATCH_CACHE_SIZE = 1 << 20
+    
+    def __init__(self, barcode_db: BarcodeDatabase):
+        self.barcode_db = barcode_db
+        self.matcher = SequenceMatcher()
+        self.cache = {}
+    
+    def match_batch(self, r1_seqs: List[bytes], r2_seqs: List[bytes]) -> List[Optional[Tuple]]:
+        """
+        Find the best barcode match for each read pair (r1_seqs[i], r2_seqs[i]) in a batch.
+        
+        Every pair is scored against all tags in both orientations with a few
+        big-integer operations. Lanes are interleaved per tag (R1f, R2f), so the
+        first lowest total follows tag order and R1f wins ties within a tag.
+        
+        The result only depends on the first lane_len bases of each read, and
+        amplicon reads share those prefixes heavily, so results are cached by
+        prefix pair and repeated prefixes skip scoring altogether. Reads too
+        short for the packed lanes share the cache under a tuple key.
+        """
+        db = self.barcode_db
+        # Illumina reads are upper-case; check once per batch so matching can skip normalizing
+        mixed_case = not (all(map(bytes.isupper, r1_seqs)) and all(map(bytes.isupper, r2_seqs)))
+        if not db.packed:
+            return [self._scan_barcode_tags(r1_seq, r2_seq, mixed_case) for r1_seq, r2_seq in zip(r1_seqs, r2_seqs)]
+        
+        # Hoist everything the loop touches into locals
+        lane_len = db.lane_len
+        lane_pad = db.lane_pad
+        lane_width = db.lane_width
+        lane_bits = 8 * lane_width
+        lane_mask = db.lane_mask
+        lane_shifts = db.lane_shifts
+        last_lane = db.num_lanes - 1
+        table_size = db.table_size
+        num_tags = len(db.locations)
+        tag_f_lanes, tag_f_mask = db.tag_f_lanes, db.tag_f_mask
+        tag_r_lanes, tag_r_mask = db.tag_r_lanes, db.tag_r_mask
+        tag_f_lens, tag_r_lens = db.tag_f_lens, db.tag_r_lens
+        from_bytes = int.from_bytes
+        cache = self.cache
+        cache_size = self.MATCH_CACHE_SIZE
+        
+        matches = []
+        append = matches.append
+        for r1_seq, r2_seq in zip(r1_seqs, r2_seqs):
+            if len(r1_seq) < lane_len or len(r2_seq) < lane_len:
+                # Short reads are scored tag by tag, so caching them pays off most
+                r1_prefix = r1_seq[:lane_len]
+                r2_prefix = r2_seq[:lane_len]
+                if mixed_case:
+                    r1_prefix = r1_prefix.upper()
+                    r2_prefix = r2_prefix.upper()
+                short_key = (r1_prefix, r2_prefix)
+                match = cache.get(short_key)
+                if match is None:
+                    match = self._scan_barcode_tags(r1_prefix, r2_prefix, False)
+                    if match is not None and len(cache) < cache_size:
+                        cache[short_key] = match
+                append(match)
+                continue
+            
+            prefix_key = r1_seq[:lane_len] + r2_seq[:lane_len]
+            if mixed_case:
+                prefix_key = prefix_key.upper()
+            match = cache.get(prefix_key)
+            if match is not None:
+                append(match)
+                continue
+            
+            r1_lane = lane_pad + prefix_key[:lane_len]
+            r2_lane = lane_pad + prefix_key[lane_len:]
+            
+            # Forward tags vs (R1, R2), reverse tags vs (R2, R1)
+            diff_f = tag_f_lanes ^ from_bytes((r1_lane + r2_lane) * num_tags, 'big')
+            diff_f |= diff_f >> 4
+            diff_f |= diff_f >> 2
+            diff_f |= diff_f >> 1
+            diff_f &= tag_f_mask
+            
+            diff_r = tag_r_lanes ^ from_bytes((r2_lane + r1_lane) * num_tags, 'big')
+            diff_r |= diff_r >> 4
+            diff_r |= diff_r >> 2
+            diff_r |= diff_r >> 1
+            diff_r &= tag_r_mask
+            
+            totals = diff_f + diff_r
+            for shift in lane_shifts:
+                totals += totals >> shift
+            totals = totals.to_bytes(table_size, 'big')[lane_width - 1::lane_width]
+            best_mismatch = min(totals)
+            lane = totals.find(best_mismatch)
+            tag_index = lane >> 1
+            
+            mismatch_f = bin((diff_f >> (lane_bits * (last_lane - lane))) & lane_mask).count('1')
+            match = (tag_index, "R2f" if lane & 1 else "R1f",
+                     mismatch_f, best_mismatch - mismatch_f,
+                     tag_f_lens[tag_index], tag_r_lens[tag_index])
+            if len(cache) < cache_size:
+                cache[prefix_key] = match
+            append(match)
+        
+        return matches
+    
+    def _scan_barcode_tags(self, r1_seq: bytes, r2_seq: bytes, mixed_case: bool = True) -> Optional[Tuple]:
+        """Find the best barcode match tag by tag (reads shorter than the longest tag)."""
+        best_mismatch = float('inf')
+        best_match = None
+        db = self.barcode_db
+        
+        # Tags are stored upper-case; normalize the read prefixes only if needed
+        if mixed_case:
+            r1_seq = r1_seq[:db.max_tag_len].upper()
+            r2_seq = r2_seq[:db.max_tag_len].upper()
+        
+        r1_len = len(r1_seq)
+        r2_len = len(r2_seq)
+        
+        # 只在目標物種的條碼中搜尋
+        for tag_index, (tag_f, tag_r, len_f, len_r) in enumerate(db.combined_list):
+            # Neither orientation fits these reads, so this tag cannot be the best match
+            if (r1_len < len_f or r2_len < len_r) and (r2_len < len_f or r1_len < len_r):
+                continue
+            
+            orientation, mismatch_f, mismatch_r, f_len, r_len = self.matcher.find_best_orientation(
+                tag_f, tag_r, r1_seq, r2_seq
+            )
+            
+            total_mismatch = mismatch_f + mismatch_r
+            
+            if total_mismatch < best_mismatch:
+                best_mismatch = total_mismatch
+                best_match = (tag_index, orientation, mismatch_f, mismatch_r, f_len, r_len)
+                # The first perfect match cannot be beaten by a later tag
+                if total_mismatch == 0:
+                    break
+        
+        return best_match
+
+
+# Matcher of a worker process, handed over once by the pool initializer
+_worker_matcher = None
+
+
+def _init_match_worker(barcode_matcher: BarcodeMatcher) -> None:
+    """Keep the barcode matcher in the worker so batches only carry reads."""
+    global _worker_matcher
+    _worker_matcher = barcode_matcher
+
+
+def _match_in_worker(read_seqs: Tuple[List[bytes], List[bytes]]) -> List[Optional[Tuple]]:
+    """Match one batch of (R1 prefixes, R2 prefixes) in a worker process."""
+    return _worker_matcher.match_batch(*read_seqs)
+
+
 class OutputManager:
     """Manages output files for the target species only."""
     
+    # Write buffer per output file; records reach the OS in ~1 MB chunks
+    FLUSH_SIZE = 1 << 20
+    
     def __init__(self, target_species: str, quality_standard: int, output_dir: str = "/app/data/outputs/trim"):
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
@@ -230,64 +422,97 @@ class OutputManager:
     def open_output_files(self) -> None:
         """Open output files for the target species only."""
         self.file_handles[self.target_species] = {
-            'F': open(self.output_dir / f"{self.target_species}.f.fq", 'w', encoding='utf-8'),
-            'R': open(self.output_dir / f"{self.target_species}.r.fq", 'w', encoding='utf-8')
+            'F': open(self.output_dir / f"{self.target_species}.f.fq", 'wb', buffering=self.FLUSH_SIZE),
+            'R': open(self.output_dir / f"{self.target_species}.r.fq", 'wb', buffering=self.FLUSH_SIZE)
         }
         print(f"Opened output files for species: {self.target_species}", flush=True)
     
+    def index_tags(self, barcode_db: BarcodeDatabase) -> None:
+        """
+        Build per-tag lookup tables indexed like barcode_db.locations, so writing a
+        read needs no string splitting or dict lookups.
+        Tags of other species get no output and are always filtered out.
+        """
+        self.tag_locations = [location.encode() for location in barcode_db.locations]
+        self.tag_f_outputs = []
+        self.tag_r_outputs = []
+        self.tag_max_mismatch = []
+        for species_prefix in barcode_db.tag_species:
+            species_files = self.file_handles.get(species_prefix)
+            if species_files:
+                self.tag_f_outputs.append(species_files['F'])
+                self.tag_r_outputs.append(species_files['R'])
+                self.tag_max_mismatch.append(self.quality_standard)
+            else:
+                self.tag_f_outputs.append(None)
+                self.tag_r_outputs.append(None)
+                self.tag_max_mismatch.append(-1)
+    
     def close_all_files(self) -> None:
-        """Close all open file handles."""
+        """Close all open file handles, flushing their buffered output."""
         for species_files in self.file_handles.values():
             for file_handle in species_files.values():
                 file_handle.close()
     
-    def write_trimmed_reads(self, read_index: str, location: str, orientation: str,
-                           r1_record: FastqRecord, r2_record: FastqRecord,
+    def write_trimmed_reads(self, read_index: int, tag_index: int, orientation: str,
+                           r1_sequence: bytes, r1_quality: bytes,
+                           r2_sequence: bytes, r2_quality: bytes,
                            mismatch_f: int, mismatch_r: int,
                            f_trim_len: int, r_trim_len: int) -> bool:
         """Write trimmed reads to output files. Returns True if written, False if filtered out."""
-        species_prefix = location.split('_')[0] if '_' in location else location
-        
         # 只處理目標物種
-        if species_prefix != self.target_species:
+        f_output = self.tag_f_outputs[tag_index]
+        if f_output is None:
             return False
         
         # 品質控制：檢查錯配是否超過標準
-        if mismatch_f > self.quality_standard or mismatch_r > self.quality_standard:
+        max_mismatch = self.tag_max_mismatch[tag_index]
+        if mismatch_f > max_mismatch or mismatch_r > max_mismatch:
             return False
         
-        # Determine correct orientation and trim sequences
+        # Determine correct orientation; sequences are trimmed as they are written
         if orientation == "R1f":
-            f_record = r1_record.trim_sequence(f_trim_len)
-            r_record = r2_record.trim_sequence(r_trim_len)
+            f_sequence, f_quality, r_sequence, r_quality = r1_sequence, r1_quality, r2_sequence, r2_quality
         else:  # R2f
-            f_record = r2_record.trim_sequence(f_trim_len)
-            r_record = r1_record.trim_sequence(r_trim_len)
+            f_sequence, f_quality, r_sequence, r_quality = r2_sequence, r2_quality, r1_sequence, r1_quality
+        
+        location = self.tag_locations[tag_index]
+        orientation = orientation.encode()
         
         # Write forward read
-        f_header = f"@f_{read_index}_{location}_{orientation}"
-        self._write_fastq_record(self.file_handles[self.target_species]['F'], 
-                                f_header, f_record.sequence, f_record.quality)
+        f_header = b"@f_%d_%b_%b" % (read_index, location, orientation)
+        self._write_fastq_record(f_output, f_header,
+                                 f_sequence[f_trim_len:], f_quality[f_trim_len:])
         
         # Write reverse read  
-        r_header = f"@r_{read_index}_{location}_{orientation}"
-        self._write_fastq_record(self.file_handles[self.target_species]['R'],
-                                r_header, r_record.sequence, r_record.quality)
+        r_header = b"@r_%d_%b_%b" % (read_index, location, orientation)
+        self._write_fastq_record(self.tag_r_outputs[tag_index], r_header,
+                                 r_sequence[r_trim_len:], r_quality[r_trim_len:])
         
         return True
     
-    def _write_fastq_record(self, file_handle: TextIO, header: str, sequence: str, quality: str) -> None:
-        """Write a single FASTQ record to file."""
-        file_handle.write(f"{header}\n{sequence}\n+\n{quality}\n")
+    def _write_fastq_record(self, file_handle: BinaryIO, header: bytes, sequence: bytes, quality: bytes) -> None:
+        """Write a single FASTQ record with one call into the file's write buffer."""
+        file_handle.write(b"%b\n%b\n+\n%b\n" % (header, sequence, quality))
 
 
 class IntegratedPipeline:
     """Main pipeline that integrates rename and trim operations."""
     
-    def __init__(self, r1_file: str, r2_file: str, barcode_file: str, quality_config: Dict[str, int]):
+    # Read pairs matched per call to the batch kernel
+    MATCH_BATCH_SIZE = 10000
+    # Processes matching read batches in parallel, one per CPU this process may
+    # run on (1 = match in this process)
+    MATCH_WORKERS = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else (os.cpu_count() or 1)
+    # Batches matched or waiting in the pool at once, whatever the worker count
+    MATCH_MAX_PENDING = 16
+    
+    def __init__(self, r1_file: str, r2_file: str, barcode_file: str, quality_config: Dict[str, int],
+                 verbose: bool = False):
         self.r1_file = r1_file
         self.r2_file = r2_file
         self.barcode_file = barcode_file
+        self.verbose = verbose  # print one match line per read
         
         # 取得目標物種和品質標準
         if len(quality_config) != 1:
@@ -298,29 +523,12 @@ class IntegratedPipeline:
         
         print(f"Pipeline configured for species: {self.target_species} (quality standard: {self.quality_standard})", flush=True)
         
-        # Generate temporary file names for renamed files
-        self.r1_renamed = self._get_renamed_filename(r1_file)
-        self.r2_renamed = self._get_renamed_filename(r2_file)
-        
         # Initialize trim components
         self.barcode_db = None
         self.fastq_processor = None
         self.output_manager = None
-        self.matcher = SequenceMatcher()
-        
-        # Results tracking
-        self.results = {}
+        self.barcode_matcher = None
 
-    def _get_renamed_filename(self, original_file: str) -> str:
-        """Generate renamed filename in outputs/rename directory."""
-        file_path = Path(original_file)
-        filename = file_path.stem
-        
-        rename_dir = Path("/app/data/outputs/rename")
-        rename_dir.mkdir(parents=True, exist_ok=True)
-        
-        return str(rename_dir / f"{filename}.rename.fq")
-    
     def run(self) -> None:
         """Run the complete rename and trim pipeline."""
         print("Starting rename and trim DNA analysis pipeline...", flush=True)
@@ -329,16 +537,8 @@ class IntegratedPipeline:
         print(f"Target species: {self.target_species} (quality standard: {self.quality_standard})", flush=True)
         
         try:
-            # Step 1: Rename R1 reads
-            print("\n=== Step 1: Renaming R1 reads ===", flush=True)
-            rename_fastq_file(self.r1_file, self.r1_renamed)
-            
-            # Step 2: Rename R2 reads
-            print("\n=== Step 2: Renaming R2 reads ===", flush=True)
-            rename_fastq_file(self.r2_file, self.r2_renamed)
-            
-            # Step 3: Trim using renamed files
-            print("\n=== Step 3: Barcode trimming ===", flush=True)
+            # Reads are renamed by position while they are trimmed
+            print("\n=== Barcode trimming ===", flush=True)
             self._run_trim_analysis()
             
             print(f"\nRename and trim completed successfully!", flush=True)
@@ -349,102 +549,117 @@ class IntegratedPipeline:
             raise
     
     def _run_trim_analysis(self) -> None:
-        """Run the trim analysis on renamed files."""
+        """Run the trim analysis on the input files."""
         # Initialize trim components with target species filter
         self.barcode_db = BarcodeDatabase(self.barcode_file, self.target_species)
-        self.fastq_processor = FastqProcessor(self.r1_renamed, self.r2_renamed)
+        self.fastq_processor = FastqProcessor(self.r1_file, self.r2_file)
         self.output_manager = OutputManager(self.target_species, self.quality_standard)
         
-        # Load renamed reads
-        self.fastq_processor.load_reads()
+        self.barcode_matcher = BarcodeMatcher(self.barcode_db)
         
         # Setup output files (only for target species)
         self.output_manager.open_output_files()
+        self.output_manager.index_tags(self.barcode_db)
         
         try:
-            # Process all reads for barcode matching
+            # Match and write all reads in a single pass
             self._process_all_reads()
             
-            # Write trimmed results
-            self._write_trimmed_results()
-            
         finally:
             # Clean up
             self.output_manager.close_all_files()
     
     def _process_all_reads(self) -> None:
-        """Process all paired reads for barcode/primer matching."""
+        """Stream every paired read through the barcode matcher and write the trimmed reads as we go."""
         print("Processing reads for barcode/primer matching...", flush=True)
         
-        total_reads = len(self.fastq_processor.paired_reads)
+        written_count = 0
+        match_lines = []
         
-        for i, (read_index, (r1_record, r2_record)) in enumerate(self.fastq_processor.paired_reads.items()):
-            if i % 10000 == 0:
-                print(f"Processed {i}/{total_reads} reads", flush=True)
-            
-            best_match = self._find_best_barcode_match(r1_record, r2_record)
-            
-            if best_match:
-                location, orientation, mismatch_f, mismatch_r, f_trim_len, r_trim_len = best_match
-                
-                # Store target results
-                species_prefix = location.split('_')[0] if '_' in location else location
-                if species_prefix == self.target_species:
-                    self.results[read_index] = {
-                        'location': location,
-                        'orientation': orientation,
-                        'mismatch_f': mismatch_f,
-                        'mismatch_r': mismatch_r,
-                        'f_trim_len': f_trim_len,
-                        'r_trim_len': r_trim_len
-                    }
-    
-    def _find_best_barcode_match(self, r1_record: FastqRecord, r2_record: FastqRecord) -> Optional[Tuple]:
-        """Find the best barcode match for a read pair."""
-        best_mismatch = float('inf')
-        best_match = None
+        batches = self.fastq_processor.iter_batches(self.MATCH_BATCH_SIZE)
+        processed = 0
         
-        # 只在目標物種的條碼中搜尋
-        for location in self.barcode_db.tags.keys():
-            tag_f, tag_r = self.barcode_db.get_combined_tags(location)
-            
-            orientation, mismatch_f, mismatch_r, f_len, r_len = self.matcher.find_best_orientation(
-                tag_f, tag_r, r1_record.sequence, r2_record.sequence
-            )
+        for batch, matches in self._match_batches(batches):
+            if processed % 100000 == 0:
+                print(f"Processed {processed} reads", flush=True)
+            processed += len(batch)
             
-            total_mismatch = mismatch_f + mismatch_r
-            
-            if total_mismatch < best_mismatch:
-                best_mismatch = total_mismatch
-                best_match = (location, orientation, mismatch_f, mismatch_r, f_len, r_len)
-        
-        return best_match
-    
-    def _write_trimmed_results(self) -> None:
-        """Write trimmed reads to output files."""
-        print("Writing trimmed reads to output files...", flush=True)
+            r1_seqs, r1_quals = batch.r1_seqs, batch.r1_quals
+            r2_seqs, r2_quals = batch.r2_seqs, batch.r2_quals
+            for row, best_match in enumerate(matches):
+                if best_match:
+                    tag_index, orientation, mismatch_f, mismatch_r, f_trim_len, r_trim_len = best_match
+                    read_index = batch.start + row
+                    
+                    if self.verbose:
+                        location = self.barcode_db.locations[tag_index]
+                        match_lines.append(f"{read_index},{location},{orientation},{mismatch_f},{mismatch_r}\n")
+                        if len(match_lines) >= 10000:
+                            sys.stdout.write(''.join(match_lines))
+                            match_lines.clear()
+                    
+                    # Write target reads straight away
+                    success = self.output_manager.write_trimmed_reads(
+                        read_index=read_index,
+                        tag_index=tag_index,
+                        orientation=orientation,
+                        r1_sequence=r1_seqs[row],
+                        r1_quality=r1_quals[row],
+                        r2_sequence=r2_seqs[row],
+                        r2_quality=r2_quals[row],
+                        mismatch_f=mismatch_f,
+                        mismatch_r=mismatch_r,
+                        f_trim_len=f_trim_len,
+                        r_trim_len=r_trim_len
+                    )
+                    
+                    if success:
+                        written_count += 1
         
-        written_count = 0
-        for read_index, result in self.results.items():
-            if read_index in self.fastq_processor.paired_reads:
-                r1_record, r2_record = self.fastq_processor.paired_reads[read_index]
-                
-                success = self.output_manager.write_trimmed_reads(
-                    read_index=read_index,
-                    location=result['location'],
-                    orientation=result['orientation'],
-                    r1_record=r1_record,
-                    r2_record=r2_record,
-                    mismatch_f=result['mismatch_f'],
-                    mismatch_r=result['mismatch_r'],
-                    f_trim_len=result['f_trim_len'],
-                    r_trim_len=result['r_trim_len']
-                )
-                
-                if success:
-                    written_count += 1
+        if match_lines:
+            sys.stdout.write(''.join(match_lines))
         
+        print(f"Processed {processed} paired reads", flush=True)
         print(f"Successfully wrote {written_count} trimmed read pairs for project '{self.target_species}'", flush=True)
+    
+    def _match_batches(self, batches: Iterator[ReadBatch]) -> Iterator[Tuple[ReadBatch, List[Optional[Tuple]]]]:
+        """
+        Yield (batch, matches) for every batch of paired reads, in input order.
+        
+        Read pairs are independent, so with more than one CPU the batches are
+        matched in a process pool while this process keeps writing results in
+        order. At most MATCH_MAX_PENDING batches are in flight, so memory stays
+        bounded by the batch size rather than the CPU count. Workers only
+        receive the read prefixes a match can depend on, and every worker keeps
+        its own prefix cache.
+        """
+        # Keep about two batches per worker in flight so none of them idles
+        workers = min(self.MATCH_WORKERS, self.MATCH_MAX_PENDING // 2)
+        first = list(islice(batches, 2))
+        # A single batch is not worth starting a pool for
+        if workers <= 1 or len(first) <= 1:
+            for batch in chain(first, batches):
+                yield batch, self.barcode_matcher.match_batch(batch.r1_seqs, batch.r2_seqs)
+            return
+        
+        # Matches only depend on the first max_tag_len bases (shorter reads keep their length)
+        prefix_len = self.barcode_db.max_tag_len
+        
+        def read_prefixes(batch):
+            return ([seq[:prefix_len] for seq in batch.r1_seqs],
+                    [seq[:prefix_len] for seq in batch.r2_seqs])
+        
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_match_worker,
+                                 initargs=(self.barcode_matcher,)) as executor:
+            pending = deque()
+            for batch in chain(first, batches):
+                pending.append((batch, executor.submit(_match_in_worker, read_prefixes(batch))))
+                if len(pending) >= self.MATCH_MAX_PENDING:
+                    batch, future = pending.popleft()
+                    yield batch, future.result()
+            while pending:
+                batch, future = pending.popleft()
+                yield batch, future.result()
 
 
 def load_quality_config(config_file: str) -> Dict[str, int]:
@@ -471,16 +686,17 @@ def load_quality_config(config_file: str) -> Dict[str, int]:
 
 def main():
     """Main function to run the rename and trim."""
-    if len(sys.argv) != 5:
-        print("Usage: python rename_trim.py <R1_fastq> <R2_fastq> <barcode_csv> <quality_config_json>", flush=True)
+    verbose = '--verbose' in sys.argv[1:]
+    args = [arg for arg in sys.argv[1:] if arg != '--verbose']
+    
+    if len(args) != 4:
+        print("Usage: python rename_trim.py <R1_fastq> <R2_fastq> <barcode_csv> <quality_config_json> [--verbose]", flush=True)
         print("Example: python rename_trim.py sample_R1.fastq sample_R2.fastq barcodes.csv quality_config.json", flush=True)
         print("Note: quality_config.json should contain exactly one species", flush=True)
+        print("       --verbose prints read_index,location,orientation,mismatch_f,mismatch_r for every matched read", flush=True)
         sys.exit(1)
     
-    r1_file = sys.argv[1]
-    r2_file = sys.argv[2]
-    barcode_file = sys.argv[3]
-    quality_config_file = sys.argv[4]
+    r1_file, r2_file, barcode_file, quality_config_file = args
     
     # 檢查檔案是否存在
     for file_path in [r1_file, r2_file, barcode_file, quality_config_file]:
@@ -492,7 +708,7 @@ def main():
     quality_config = load_quality_config(quality_config_file)
     
     # 執行分析管道
-    pipeline = IntegratedPipeline(r1_file, r2_file, barcode_file, quality_config)
+    pipeline = IntegratedPipeline(r1_file, r2_file, barcode_file, quality_config, verbose=verbose)
     pipeline.run()
 
 
@@ -4,6 +4,9 @@ import subprocess
 import os
 import sys
 # import logging
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import repeat
 from pathlib import Path
 
 sys.stdout = os.fdopen(sys.stdout.fileno(), 'w', 1)
@@ -19,24 +22,29 @@ class PEARTools:
         self.trim_output_dir = "/app/data/outputs/trim"
         self.pear_output_dir = "/app/data/outputs/pear"
     
-    def run_command(self, cmd, cwd=None, capture_output=True):
-        try:
-            print(f"Executing: {' '.join(cmd)}", flush=True)
-            
-            result = subprocess.run(
-                cmd,
-                cwd=cwd,
-                capture_output=capture_output,
-                text=True,
-                check=True
-            )
-            
-            return result
-            
-        except subprocess.CalledProcessError as e:
+    def run_command(self, cmd, cwd=None):
+        # -- stream the tool's output line by line instead of buffering it all in memory
+        print(f"Executing: {' '.join(cmd)}", flush=True)
+        
+        process = subprocess.Popen(
+            cmd,
+            cwd=cwd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            bufsize=1
+        )
+        for line in process.stdout:
+            print(line, end='', flush=True)
+        process.stdout.close()
+        returncode = process.wait()
+        
+        if returncode:
             print(f"Command failed: {' '.join(cmd)}", flush=True)
-            print(f"Error: {e.stderr}", flush=True)
-            raise
+            print(f"Error: exit status {returncode}", flush=True)
+            raise subprocess.CalledProcessError(returncode, cmd)
+        
+        return subprocess.CompletedProcess(cmd, returncode)
     
     def pear_join(self, forward_file, reverse_file, output_prefix, threads=4):
         """
@@ -69,6 +77,58 @@ class PEARTools:
             'discarded': f"{output_prefix}.discarded.fastq"
         }
 
+def count_lines(path):
+    """Count lines by scanning the file in 1 MB binary blocks (C-level newline search)."""
+    lines = 0
+    last = b'\n'
+    with open(path, 'rb') as f:
+        for block in iter(partial(f.read, 1 << 20), b''):
+            lines += block.count(b'\n')
+            last = block[-1:]
+    # -- a last line without trailing newline still counts
+    return lines + (last != b'\n')
+
+def process_one_species(species_data, tools, threads_per_job=4):
+    species = species_data['species']
+    print(f"\n{'='*30}", flush=True)
+    print(f"Processing project: {species}", flush=True)
+    print(f"{'='*30}", flush=True)
+    
+    try:
+        # -- PEAR
+        output_prefix = f"{tools.pear_output_dir}/{species}"
+        
+        pear_results = tools.pear_join(
+            forward_file=species_data['forward'],
+            reverse_file=species_data['reverse'],
+            output_prefix=output_prefix,
+            threads=threads_per_job
+        )
+        
+        if pear_results:
+            print(f"{species} PEAR completed successfully", flush=True)
+            
+            # results
+            for file_type, filename in pear_results.items():
+                filepath = Path(filename)
+                if filepath.exists():
+                    # 計算序列數量
+                    try:
+                        seq_count = (count_lines(filepath) + 3) // 4  # FASTQ headers
+                    except:
+                        seq_count = "unknown"
+                    
+                    file_size = filepath.stat().st_size
+                    print(f"  {file_type}: {filepath.name} ({seq_count} sequences, {file_size} bytes)", flush=True)
+                else:
+                    print(f"  {file_type}: {filepath.name} (file not generated)", flush=True)
+        
+        return species, pear_results
+        
+    except Exception as e:
+        print(f"Processing failed for {species}: {e}", flush=True)
+        return species, None
+
 def run_pear_analysis():
     tools = PEARTools()
     
@@ -96,10 +156,8 @@ def run_pear_analysis():
             
             # -- check file size and sequence count
             try:
-                with open(f_file, 'r') as f:
-                    f_lines = sum(1 for line in f)
-                with open(r_file, 'r') as f:
-                    r_lines = sum(1 for line in f)
+                f_lines = count_lines(f_file)
+                r_lines = count_lines(r_file)
                 
                 f_seqs = f_lines // 4
                 r_seqs = r_lines // 4
@@ -118,51 +176,17 @@ def run_pear_analysis():
         print("No species files found in trim output directory", flush=True)
         return {}
     
-    # -- process each species
+    # -- process species concurrently, each PEAR job with its own threads
+    threads_per_job = 4
+    max_workers = max(1, min(len(species_files), (os.cpu_count() or 1) // threads_per_job))
+    print(f"\nRunning {len(species_files)} PEAR job(s), {max_workers} at a time ({threads_per_job} threads each)", flush=True)
+    
     results = {}
-    for species_data in species_files:
-        species = species_data['species']
-        print(f"\n{'='*30}", flush=True)
-        print(f"Processing project: {species}", flush=True)
-        print(f"{'='*30}", flush=True)
-        
-        try:
-            # -- PEAR
-            output_prefix = f"{tools.pear_output_dir}/{species}"
-            
-            pear_results = tools.pear_join(
-                forward_file=species_data['forward'],
-                reverse_file=species_data['reverse'],
-                output_prefix=output_prefix
-            )
-            
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for species, pear_results in executor.map(process_one_species, species_files,
+                                                  repeat(tools), repeat(threads_per_job)):
             if pear_results:
-                print(f"{species} PEAR completed successfully", flush=True)
-                
-                # results
-                for file_type, filename in pear_results.items():
-                    filepath = Path(filename)
-                    if filepath.exists():
-                        # 計算序列數量
-                        seq_count = 0
-                        try:
-                            with open(filepath, 'r') as f:
-                                for line_num, line in enumerate(f):
-                                    if line_num % 4 == 0:  # FASTQ header
-                                        seq_count += 1
-                        except:
-                            seq_count = "unknown"
-                        
-                        file_size = filepath.stat().st_size
-                        print(f"  {file_type}: {filepath.name} ({seq_count} sequences, {file_size} bytes)", flush=True)
-                    else:
-                        print(f"  {file_type}: {filepath.name} (file not generated)", flush=True)
-                
                 results[species] = pear_results
-            
-        except Exception as e:
-            print(f"Processing failed for {species}: {e}", flush=True)
-            continue
     
     print(f"PEAR processing completed", flush=True)
     
@@ -175,10 +199,11 @@ def list_available_files():
     trim_dir = "/app/data/outputs/trim"
     if os.path.exists(trim_dir):
         print(f"\nTrim output directory: {trim_dir}", flush=True)
-        files = sorted(Path(trim_dir).glob("*"))
+        with os.scandir(trim_dir) as it:
+            files = sorted(it, key=lambda entry: entry.name)
         if files:
             for file in files:
-                size = file.stat().st_size if file.exists() else 0
+                size = file.stat().st_size
                 print(f"  {file.name} ({size} bytes)", flush=True)
         else:
             print("  (empty directory)", flush=True)
@@ -189,10 +214,11 @@ def list_available_files():
     pear_dir = "/app/data/outputs/pear"
     if os.path.exists(pear_dir):
         print(f"\nPEAR output directory: {pear_dir}", flush=True)
-        files = sorted(Path(pear_dir).glob("*"))
+        with os.scandir(pear_dir) as it:
+            files = sorted(it, key=lambda entry: entry.name)
         if files:
             for file in files:
-                size = file.stat().st_size if file.exists() else 0
+                size = file.stat().st_size
                 print(f"  {file.name} ({size} bytes)", flush=True)
         else:
             print("  (empty directory)", flush=True)
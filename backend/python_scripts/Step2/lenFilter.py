@@ -1,6 +1,8 @@
 import os
 import glob
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 
 sys.stdout = os.fdopen(sys.stdout.fileno(), 'w', 1)
 sys.stderr = os.fdopen(sys.stderr.fileno(), 'w', 1)
@@ -24,19 +26,25 @@ def process_assembled_fastq(directory = "/app/data/outputs/pear"):
 
 
 def convert_fq_to_fa_and_filter(fastq_file, output_file, delete_seq_file, min_length = 200, max_length = None):
-    with open(fastq_file, 'r') as f_in, open(output_file, 'w') as f_out, open(delete_seq_file, 'w') as f_del:
-        lines = f_in.readlines()
-        for i in range(0, len(lines), 4):
-            header = lines[i].strip().replace('@', '>', 1)
-            sequence = lines[i+1].strip()
+    # -- stream four lines at a time in binary mode; memory stays O(1 record)
+    with open(fastq_file, 'rb', buffering = 1 << 20) as f_in, \
+         open(output_file, 'wb', buffering = 1 << 20) as f_out, \
+         open(delete_seq_file, 'wb', buffering = 1 << 20) as f_del:
+        lines = iter(f_in)
+        for header in lines:
+            sequence = next(lines, b'').rstrip(b'\r\n')
+            next(lines, None)  # -- '+' line
+            next(lines, None)  # -- quality line
+
+            header = header.rstrip(b'\r\n').replace(b'@', b'>', 1)
 
             min_check = len(sequence) >= min_length
             max_check = (max_length is None) or (len(sequence) <= max_length)
 
             if min_check and max_check:
-                f_out.write(f"{header}\n{sequence}\n")
+                f_out.write(header + b'\n' + sequence + b'\n')
             else:
-                f_del.write(f"{header}\n{sequence}\n")
+                f_del.write(header + b'\n' + sequence + b'\n')
 
 
 def filter_and_convert(assembled_files, min_length, max_length = None):
@@ -49,12 +57,29 @@ def filter_and_convert(assembled_files, min_length, max_length = None):
     if not assembled_files:
         return
 
-    for sample_name, fastq_file in assembled_files.items():
+    def convert_sample(item):
+        sample_name, fastq_file = item
         output_path = os.path.join(output_dir, f"{sample_name}.assembled.len.fasta")
         delete_seq_file = os.path.join(delete_dir, f"{sample_name}.assembled.del.fasta")
         print(output_path, flush=True)
         convert_fq_to_fa_and_filter(fastq_file, output_path, delete_seq_file, min_length, max_length)
 
+    # -- I/O bound: overlap reading/writing of several samples with threads
+    with ThreadPoolExecutor(max_workers = min(8, len(assembled_files))) as executor:
+        list(executor.map(convert_sample, assembled_files.items()))
+
+
+def count_fasta_headers(fasta_file):
+    """Count '>' header lines by scanning 1 MB binary blocks"""
+    count = 0
+    last = b'\n'
+    with open(fasta_file, 'rb') as f:
+        for block in iter(partial(f.read, 1 << 20), b''):
+            # -- a header split across blocks is caught by the previous block's last byte
+            count += block.count(b'\n>') + (last == b'\n' and block[:1] == b'>')
+            last = block[-1:]
+    return count
+
 
 def validate_filter_results(directory = "/app/data/outputs/filter"):
     total_sequences = 0
@@ -67,10 +92,7 @@ def validate_filter_results(directory = "/app/data/outputs/filter"):
         sys.exit(1)
 
     for file_path in files:
-        with open(file_path, 'r') as f:
-            for line in f:
-                if line.startswith('>'):
-                    total_sequences += 1
+        total_sequences += count_fasta_headers(file_path)
 
     if total_sequences < 2:
         error_message = f"Validation Error: Not enough sequences remained after filtering (found {total_sequences}, require at least 2). This wll cause downstream alignment to fail. Please adjust your min/max length settings."
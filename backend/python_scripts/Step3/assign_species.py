@@ -42,77 +42,72 @@ def species_assignment(keyword, identity_threshold):
     output_dir.mkdir(parents=True, exist_ok=True)
     
     outfile_path = output_dir / f"{species_name}.assign.species"
-    outfile = open(outfile_path, "w")
+    outfile = open(outfile_path, "w", buffering=1 << 20)
     
     print(f"Output will be written to: {outfile_path}", flush=True)
     
-    # -- read bln+species file
+    # -- read bln+species file, keeping only the winning hit per read:
+    # -- the first hit of the highest priority level seen so far
+    # -- (2: keyword + identity >= threshold, 1: identity >= threshold, 0: any hit)
     dt = {}
+    dt_get = dt.get
+    # -- BLAST references repeat across reads: species field -> (has keyword, species name)
+    species_info = {}
+    top_level = 2 if has_keyword else 1
     total_lines = 0
     
     with open(blnfile_name, 'r', encoding='utf-8') as file:
         for i, line in enumerate(file):
             total_lines += 1
-            if total_lines % 1000 == 0:
+            # -- each progress line is a flushed write picked up by the backend; keep them sparse
+            if total_lines % 100000 == 0:
                 print(f"Reading line {total_lines}...", flush=True)
             
             line = line.rstrip()
             if not line:  # skip empty lines
                 continue
                 
-            fields = line.split(',')
+            # -- only the first three columns are used; leave the rest unsplit
+            fields = line.split(',', 3)
             read_id = fields[0]
+            
+            # -- later hits can never beat a top-level winner
+            best = dt_get(read_id)
+            if best is not None and best[0] == top_level:
+                continue
+            
             identity = float(fields[2])
             species = fields[1]
-
-            try:
-                ref_id, ref_rest = species.split('.1:')
-                extracted_species_name = '_'.join(ref_rest.split('_')[1:3])
-            except:
-                extracted_species_name = '_'.join(species.split('_')[1:3])
             
-            # -- No longer filter out sp. or china species, keep all hits
-            if read_id in dt:
-                dt[read_id].append([extracted_species_name, species, identity, line])
-            else:
-                dt[read_id] = [[extracted_species_name, species, identity, line]]
+            info = species_info.get(species)
+            if info is None:
+                # -- "<ref>.1:<rest>" names the species in <rest>, otherwise in the whole field
+                ref_id, sep, ref_rest = species.partition('.1:')
+                if not sep or '.1:' in ref_rest:
+                    ref_rest = species
+                info = species_info[species] = (
+                    bool(has_keyword) and keyword in species.split('_'),
+                    '_'.join(ref_rest.split('_', 3)[1:3])
+                )
+            has_species_keyword, extracted_species_name = info
+            
+            level = 0
+            if identity >= identity_threshold:
+                level = 2 if has_species_keyword else 1
+            
+            if best is not None and level <= best[0]:
+                continue
+            
+            # -- No longer filter out sp. or china species; every hit competes
+            dt[read_id] = (level, extracted_species_name + ',' + str(identity) + ',' + line)
     
     print(f"Finished reading {total_lines} lines, found {len(dt)} unique reads", flush=True)
     
-    assigned_count = 0
-    for read_id in dt.keys():
-        assigned_count += 1
-        if assigned_count % 10000 == 0:
-            print(f"Assigned {assigned_count} reads...", flush=True)
-        
-        # -- Priority 1: check keyword + identity >= threshold
-        priority = 0 
-        if has_keyword:
-            for i, hit in enumerate(dt[read_id]):
-                extracted_species_name, species, identity, line = hit
-                full_species_info = species.split('_')
-                if keyword in full_species_info and identity >= identity_threshold:
-                    print_line = extracted_species_name + ',' + str(identity) + ',' + line
-                    priority = 1
-                    break
-        
-        # -- Priority 2: if no keyword match, choose first with identity >= threshold
-        secondary = 0
-        if not priority:
-            for i, hit in enumerate(dt[read_id]):
-                extracted_species_name, species, identity, line = hit
-                if identity >= identity_threshold:
-                    print_line = extracted_species_name + ',' + str(identity) + ',' + line
-                    secondary = 1
-                    break
-        
-        # -- Priority 3: if none above, choose the first one
-        if not priority and not secondary: 
-            extracted_species_name, species, identity, line = dt[read_id][0]
-            print_line = extracted_species_name + ',' + str(identity) + ',' + line
-        
-        outfile.write(read_id + ',' + print_line + '\n')
+    out_rows = [f"{read_id},{print_line}\n" for read_id, (level, print_line) in dt.items()]
+    assigned_count = len(out_rows)
     
+    # -- one bulk write instead of a write call per read
+    outfile.writelines(out_rows)
     outfile.close()
     print(f"Species assignment completed! Assigned {assigned_count} reads to {outfile_path}", flush=True)
 
@@ -4,6 +4,7 @@ import subprocess
 import os
 # import logging
 import sys
+from functools import partial
 from pathlib import Path
 
 class BLASTTools:
@@ -79,11 +80,13 @@ class BLASTTools:
     def count_sequences_in_fasta(self, fasta_file):
         """Count NCBI sequence amount"""
         try:
+            # -- count '\n>' in 1 MB binary blocks; reference databases can be large
             count = 0
-            with open(fasta_file, 'r') as f:
-                for line in f:
-                    if line.startswith('>'):
-                        count += 1
+            last = b'\n'
+            with open(fasta_file, 'rb') as f:
+                for block in iter(partial(f.read, 1 << 20), b''):
+                    count += block.count(b'\n>') + (last == b'\n' and block[:1] == b'>')
+                    last = block[-1:]
             return count
         except Exception as e:
             print(f"Error counting sequences in {fasta_file}: {e}", flush=True)
@@ -1,9 +1,14 @@
 #!/usr/bin/env python3
 
+import csv
 import os
 import sys
 from pathlib import Path
 from collections import defaultdict
+from itertools import chain
+
+# Records joined per write in write_species_fasta (bounds the temporary string)
+FASTA_WRITE_CHUNK = 100000
 
 def parse_assign_species(assign_file):
     """
@@ -19,18 +24,17 @@ def parse_assign_species(assign_file):
     seq_to_species = {}
     species_count = defaultdict(int)  # Initialize dictionary with default value 0
     
-    with open(assign_file, 'r', encoding='utf-8') as f:
-        for line_num, line in enumerate(f, 1):
-            line = line.rstrip()
-            if line:
-                parts = line.split(',')  # ['f_3_CypDL_XkB_R1f', 'Opsariichthys_pachycephalus', '98.605', 'f_3_CypDL_XkB_R1f', ...]
-                if len(parts) >= 2:
-                    seq_name = parts[0]  # sequence name
-                    species = parts[1]   # species name
-                    seq_to_species[seq_name] = species
-                    species_count[species] += 1
-                else:
-                    print(f"Warning: Line {line_num} has incorrect format: {line}", flush=True)
+    # Tokenize with the C csv reader; QUOTE_NONE keeps quotes literal, like a plain split(',')
+    with open(assign_file, 'r', encoding='utf-8', newline='') as f:
+        for line_num, parts in enumerate(csv.reader(f, quoting=csv.QUOTE_NONE), 1):
+            # parts = ['f_3_CypDL_XkB_R1f', 'Opsariichthys_pachycephalus', '98.605', 'f_3_CypDL_XkB_R1f', ...]
+            if len(parts) >= 2:
+                seq_name = parts[0]  # sequence name
+                species = parts[1]   # species name
+                seq_to_species[seq_name] = species
+                species_count[species] += 1
+            elif parts and parts[0].strip():
+                print(f"Warning: Line {line_num} has incorrect format: {parts[0].rstrip()}", flush=True)
     
     return seq_to_species, species_count
 
@@ -42,17 +46,17 @@ def read_fasta_sequences(fasta_file):
     """
     sequences = {}
     
+    # Read the whole file and split it into records at once; sequence lines
+    # of multi-line records are joined back together
     with open(fasta_file, 'r', encoding='utf-8') as f:
-        while True:
-            header = f.readline().rstrip()
-            if not header:
-                break
-            sequence = f.readline().rstrip()
-            
-            if header.startswith('>'):
-                seq_name = header.split()[0][1:]
-                sequences[seq_name] = (header, sequence)
-                # Example: { f_0_CypDL_NNWra_R1f: ('>f_0_CypDL_NNWra_R1f', 'ACCCATTATT...') }
+        records = ('\n' + f.read()).split('\n>')[1:]
+    
+    for record in records:
+        header, _, sequence = record.partition('\n')
+        header = '>' + header.rstrip()
+        seq_name = header.split()[0][1:]
+        sequences[seq_name] = (header, ''.join(sequence.split()))
+        # Example: { f_0_CypDL_NNWra_R1f: ('>f_0_CypDL_NNWra_R1f', 'ACCCATTATT...') }
     
     return sequences
 
@@ -101,11 +105,11 @@ def write_species_fasta(species_sequences, prefix):
         clean_species = species.replace(' ', '_').replace('/', '_').replace('\\', '_')
         output_file = output_dir / f"{prefix}_{clean_species}.fasta"
         
-        with open(output_file, 'w', encoding='utf-8') as f:
-            for header, seq in seqs:
-                # header = ">f_132_ZpDL_CHR_R2f"
-                f.write(f"{header}\n")
-                f.write(f"{seq}\n")
+        # header = ">f_132_ZpDL_CHR_R2f"; records are joined and written in chunks of FASTA_WRITE_CHUNK
+        with open(output_file, 'w', encoding='utf-8', buffering=1 << 20) as f:
+            for start in range(0, len(seqs), FASTA_WRITE_CHUNK):
+                f.write('\n'.join(chain.from_iterable(seqs[start:start + FASTA_WRITE_CHUNK])))
+                f.write('\n')
         
         output_files.append(str(output_file))
         print(f"Species {species}: {len(seqs)} sequences -> {output_file}", flush=True)
@@ -2,6 +2,9 @@
 
 import subprocess
 import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
+from itertools import repeat
 from pathlib import Path
 
 class MAFFTTools:
@@ -84,11 +87,20 @@ def count_sequences(fasta_file):
     if not Path(fasta_file).exists():
         return 0
     
+    # -- files are counted several times per run; only rescan when they change
+    stat = Path(fasta_file).stat()
+    return _count_headers(str(fasta_file), stat.st_mtime_ns, stat.st_size)
+
+@lru_cache(maxsize=None)
+def _count_headers(fasta_file, mtime_ns, size):
+    """Count '>' header lines by scanning 1 MB binary blocks"""
     count = 0
-    with open(fasta_file, 'r') as f:
-        for line in f:
-            if line.startswith('>'):
-                count += 1
+    last = b'\n'
+    with open(fasta_file, 'rb') as f:
+        for block in iter(partial(f.read, 1 << 20), b''):
+            # -- a header split across blocks is caught by the previous block's last byte
+            count += block.count(b'\n>') + (last == b'\n' and block[:1] == b'>')
+            last = block[-1:]
     return count
 
 def get_file_size(file_path):
@@ -96,7 +108,10 @@ def get_file_size(file_path):
     if not Path(file_path).exists():
         return "0 bytes"
     
-    size = Path(file_path).stat().st_size
+    return format_size(Path(file_path).stat().st_size)
+
+def format_size(size):
+    """Format a byte count in human readable form"""
     if size < 1024:
         return f"{size} bytes"
     elif size < 1024**2:
@@ -106,6 +121,49 @@ def get_file_size(file_path):
     else:
         return f"{size/(1024**3):.1f} GB"
 
+def align_one_species(species_data, tools, mafft_output_dir, threads_per_job=2):
+    species = species_data['species']
+    input_file = species_data['hap_file']
+    output_file = f"{mafft_output_dir}/{species}.msa.fa"
+    
+    print(f"\nProcessing species: {species}", flush=True)
+    
+    # -- if input has enough sequences for alignment
+    seq_count = count_sequences(input_file)
+    if seq_count < 2:
+        print(f"  Skipping {species}: only {seq_count} sequence(s) found (need at least 2)", flush=True)
+        return species, None
+    
+    try:
+        # Run MAFFT alignment
+        result_file = tools.mafft_align(
+            input_file=input_file,
+            output_file=output_file,
+            threads=threads_per_job
+        )
+        
+        # Check results
+        if Path(result_file).exists():
+            output_seq_count = count_sequences(result_file)
+            output_size = get_file_size(result_file)
+            
+            print(f"  ✓ {species} alignment completed", flush=True)
+            print(f"    Output: {Path(result_file).name} ({output_seq_count} sequences, {output_size})", flush=True)
+            
+            return species, {
+                'input_file': input_file,
+                'output_file': result_file,
+                'input_sequences': seq_count,
+                'output_sequences': output_seq_count
+            }
+        else:
+            print(f"  ✗ {species} alignment failed: output file not created", flush=True)
+            
+    except Exception as e:
+        print(f"  ✗ {species} alignment failed: {e}", flush=True)
+    
+    return species, None
+
 def MAFFT():
     tools = MAFFTTools()
     
@@ -159,48 +217,17 @@ def MAFFT():
     
     print(f"\nStarting MAFFT alignment for {len(species_files)} species...", flush=True)
     
-    # Process each species
+    # -- align species concurrently; small alignments gain little beyond a couple of threads
+    threads_per_job = 2
+    max_workers = max(1, min(len(species_files), (os.cpu_count() or 1) // threads_per_job))
+    print(f"Running {max_workers} MAFFT job(s) at a time ({threads_per_job} threads each)", flush=True)
+    
     results = {}
-    for species_data in species_files:
-        species = species_data['species']
-        input_file = species_data['hap_file']
-        output_file = f"{mafft_output_dir}/{species}.msa.fa"
-        
-        print(f"\nProcessing species: {species}", flush=True)
-        
-        # -- if input has enough sequences for alignment
-        seq_count = count_sequences(input_file)
-        if seq_count < 2:
-            print(f"  Skipping {species}: only {seq_count} sequence(s) found (need at least 2)", flush=True)
-            continue
-        
-        try:
-            # Run MAFFT alignment
-            result_file = tools.mafft_align(
-                input_file=input_file,
-                output_file=output_file
-            )
-            
-            # Check results
-            if Path(result_file).exists():
-                output_seq_count = count_sequences(result_file)
-                output_size = get_file_size(result_file)
-                
-                print(f"  ✓ {species} alignment completed", flush=True)
-                print(f"    Output: {Path(result_file).name} ({output_seq_count} sequences, {output_size})", flush=True)
-                
-                results[species] = {
-                    'input_file': input_file,
-                    'output_file': result_file,
-                    'input_sequences': seq_count,
-                    'output_sequences': output_seq_count
-                }
-            else:
-                print(f"  ✗ {species} alignment failed: output file not created", flush=True)
-                
-        except Exception as e:
-            print(f"  ✗ {species} alignment failed: {e}", flush=True)
-            continue
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for species, result in executor.map(align_one_species, species_files, repeat(tools),
+                                            repeat(mafft_output_dir), repeat(threads_per_job)):
+            if result:
+                results[species] = result
     
     print(f"\nMAFFT alignment completed!", flush=True)
     print(f"Successfully aligned {len(results)} species", flush=True)
@@ -219,11 +246,13 @@ def list_available_files():
     classifier_dir = "/app/data/outputs/classifier"
     if os.path.exists(classifier_dir):
         print(f"\nClassifier output directory: {classifier_dir}", flush=True)
-        files = list(Path(classifier_dir).glob("*"))
+        # -- scandir returns name, type and (cached) stat in one pass over the directory
+        with os.scandir(classifier_dir) as it:
+            files = sorted(it, key=lambda entry: entry.name)
         if files:
-            for file in sorted(files):
-                size = get_file_size(file)
-                seq_count = count_sequences(file) if file.suffix in ['.fa', '.fasta', '.species'] else 0
+            for file in files:
+                size = format_size(file.stat().st_size)
+                seq_count = count_sequences(file.path) if file.name.endswith(('.fa', '.fasta')) else 0
                 seq_info = f" ({seq_count} sequences)" if seq_count > 0 else ""
                 print(f"  {file.name} ({size}){seq_info}", flush=True)
         else:
@@ -235,11 +264,12 @@ def list_available_files():
     mafft_dir = "/app/data/outputs/mafft"
     if os.path.exists(mafft_dir):
         print(f"\nMAFFT output directory: {mafft_dir}", flush=True)
-        files = list(Path(mafft_dir).glob("*"))
+        with os.scandir(mafft_dir) as it:
+            files = sorted(it, key=lambda entry: entry.name)
         if files:
-            for file in sorted(files):
-                size = get_file_size(file)
-                seq_count = count_sequences(file) if file.suffix in ['.fa', '.fasta'] else 0
+            for file in files:
+                size = format_size(file.stat().st_size)
+                seq_count = count_sequences(file.path) if file.name.endswith(('.fa', '.fasta')) else 0
                 seq_info = f" ({seq_count} sequences)" if seq_count > 0 else ""
                 print(f"  {file.name} ({size}){seq_info}", flush=True)
         else:
@@ -6,35 +6,32 @@ def process_fasta(input_file, output_file):
     Read FASTA file and convert format
     Convert each sequence to: name\tsequence format
     """
-    with open(input_file, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
-    
-    processed_data = []
+    # -- stream records straight to the output; sequence lines are joined once per record
+    sequence_count = 0
     current_name = ""
-    current_sequence = ""
+    sequence_parts = []
     
-    for line in lines:
-        line = line.strip()
-        
-        if line.startswith('>'):
-            if current_name:  # -- process previous sequence first
-                processed_data.append(f"{current_name}\t{current_sequence}")
+    with open(input_file, 'r', encoding='utf-8') as f, open(output_file, 'w', encoding='utf-8') as out:
+        for line in f:
+            line = line.strip()
             
-            # -- remove the leading '>'
-            current_name = line[1:]
-            current_sequence = ""
-        else:
-            current_sequence += line
-    
-    # -- process the last sequence
-    if current_name:
-        processed_data.append(f"{current_name}\t{current_sequence}")
-    
-    with open(output_file, 'w', encoding='utf-8') as f:
-        for line in processed_data:
-            f.write(line + '\n')
+            if line.startswith('>'):
+                if current_name:  # -- process previous sequence first
+                    out.write(f"{current_name}\t{''.join(sequence_parts)}\n")
+                    sequence_count += 1
+                
+                # -- remove the leading '>'
+                current_name = line[1:]
+                sequence_parts = []
+            else:
+                sequence_parts.append(line)
+        
+        # -- process the last sequence
+        if current_name:
+            out.write(f"{current_name}\t{''.join(sequence_parts)}\n")
+            sequence_count += 1
     
-    print(f"Processing complete! Processed {len(processed_data)} sequences", flush=True)
+    print(f"Processing complete! Processed {sequence_count} sequences", flush=True)
     print(f"Results saved to {output_file}", flush=True)
 
 # Usage example
@@ -2,9 +2,12 @@
 
 """
 to trim 5' and 3' continuous gaps
-two steps:
+two steps over a single read of the input:
 1. count number of gaps
 2. actually trim them
+
+MAFFT alignments (*.fa) are read directly; the ID\tsequence output is the
+same as running tabFormatter first and trimming its .tab files.
 """
 
 import sys
@@ -28,54 +31,76 @@ def trim_alignment_gaps(infile_name, output_dir):
     print(f"Output directory: ", output_dir, flush=True)
     output_file = os.path.join(output_dir, f"{input_name}.trimmed.fa")
     
-    # -- 1. counts, maximum
-    max5 = 0
-    max3 = 0
-    
+    # -- 1. read the alignment once; counts, maximum
     with open(infile_name, 'r') as f:
-        for i, line in enumerate(f):
-            line = line.rstrip()
-            
-            if not line or '\t' not in line:
-                continue
-                
-            read_id, read_seq = line.split('\t')
-
-            # -- 5'
-            end5 = 0
-            for j, nuc in enumerate(read_seq):
-                if nuc == "-":
-                    end5 += 1
-                else:
-                    break
-
-            if end5 > max5: 
-                max5 = end5
-
-            # -- 3'
-            end3 = 0
-            for j in range(1, len(read_seq)+1):
-                nuc = read_seq[-j]
-                if nuc == "-":
-                    end3 += 1
-                else:
-                    break
-
-            if end3 > max3: 
-                max3 = end3
+        lines = (line.rstrip() for line in f)
+        records = [line.split('\t', 1) for line in lines if '\t' in line]
+
+    # -- 5' and 3' gap runs, measured by C-level strips
+    max5 = max((len(read_seq) - len(read_seq.lstrip('-')) for _, read_seq in records), default=0)
+    max3 = max((len(read_seq) - len(read_seq.rstrip('-')) for _, read_seq in records), default=0)
 
     print(f"  Max 5' gaps: {max5}, Max 3' gaps: {max3}", flush=True)
 
-    # -- 2. actually trim and write to output file
-    with open(infile_name, 'r') as f, open(output_file, 'w') as out:
-        for i, line in enumerate(f):
-            line = line.rstrip()
+    # -- 2. actually trim them
+    write_trimmed_records(records, max5, max3, output_file)
+
+
+def process_msa(fa_path, output_dir):
+    """
+    Convert a MAFFT alignment to ID\tsequence and trim 5' and 3' gaps in one pass,
+    without writing the intermediate .tab file
+
+    Args:
+        fa_path: MAFFT output file path (FASTA, sequences may span several lines)
+        output_dir: Output directory path
+    """
+
+    print(f"Processing: {Path(fa_path).name}", flush=True)
+
+    # -- keep the name tabFormatter + trim_alignment_gaps would produce (X.msa.tab.trimmed.fa)
+    base_name = os.path.splitext(Path(fa_path).name)[0]
+    output_file = os.path.join(output_dir, f"{base_name}.tab.trimmed.fa")
+
+    # -- 1. parse the records; counts, maximum
+    records = []
+    max5 = 0
+    max3 = 0
+
+    def add_record(read_id, parts):
+        nonlocal max5, max3
+        read_seq = ''.join(parts)
+        # -- names are required, and empty sequences were never written by the .tab route
+        if not read_id or not read_seq:
+            return
+        records.append((read_id, read_seq))
+        max5 = max(max5, len(read_seq) - len(read_seq.lstrip('-')))
+        max3 = max(max3, len(read_seq) - len(read_seq.rstrip('-')))
+
+    read_id = ""
+    parts = []
+    with open(fa_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+
+            if line.startswith('>'):
+                add_record(read_id, parts)
+                read_id = line[1:]
+                parts = []
+            else:
+                parts.append(line)
+    add_record(read_id, parts)
+
+    print(f"  Max 5' gaps: {max5}, Max 3' gaps: {max3}", flush=True)
 
-            if not line or '\t' not in line:
-                continue
+    # -- 2. actually trim them
+    write_trimmed_records(records, max5, max3, output_file)
 
-            read_id, read_seq = line.split('\t')
 
+def write_trimmed_records(records, max5, max3, output_file):
+    """Write (ID, sequence) records with max5 leading and max3 trailing columns removed"""
+    with open(output_file, 'w') as out:
+        for read_id, read_seq in records:
             len3 = len(read_seq) - max3
             read_seq = read_seq[max5:len3]
 
@@ -86,7 +111,7 @@ def trim_alignment_gaps(infile_name, output_dir):
 
 
 if __name__ == "__main__":
-    input_dir = "/app/data/outputs/tab_formatter"
+    input_dir = "/app/data/outputs/mafft"
     output_dir = "/app/data/outputs/trimmed"
     
     # Create output directory if it doesn't exist
@@ -96,17 +121,17 @@ if __name__ == "__main__":
         print(f"Input directory not found: {input_dir}", flush=True)
         sys.exit(1)
     
-    # Process all files in directory
-    all_files = [f for f in Path(input_dir).iterdir() if f.is_file()]
+    # Process all MAFFT alignments in directory
+    all_files = [f for f in Path(input_dir).glob("*.fa") if f.is_file()]
     
     if not all_files:
-        print(f"No files found in {input_dir}", flush=True)
+        print(f"No FASTA files found in {input_dir}", flush=True)
         sys.exit(1)
     
     print(f"Found {len(all_files)} files to process in {input_dir}", flush=True)
     print(f"Output will be saved to: {output_dir}", flush=True)
     
     for file_path in sorted(all_files):
-        trim_alignment_gaps(str(file_path), output_dir)
+        process_msa(str(file_path), output_dir)
     
     print(f"\nAll files processed! Check output in: {output_dir}", flush=True)
\ No newline at end of file
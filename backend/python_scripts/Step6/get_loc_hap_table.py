@@ -8,6 +8,7 @@ Batch processing for all species in separated directory
 import sys
 import os
 import glob
+from collections import Counter
 
 def load_location(csv_file, target_species):
     """Load location list from CSV file for specific species"""
@@ -46,13 +47,15 @@ def load_location(csv_file, target_species):
 # -- input_files: .dup.list file
 # -- output_files: .tbl.csv file
 def generate_haplotype_table(input_file, output_file, locations):
-    dt = {}
-    haplotypes = []
+    dt = Counter()  # -- (location, hap_index) -> read count
+    haplotypes = {}  # -- insertion-ordered set of haplotype indices
+
+    dt_get = dt.get
 
     print(f"Processing: {input_file.split('/')[-1]}")
     
     # -- first: collapse all reads in each haplotype
-    # -- dt:  {'CHR_0': 681, 'Bie_0': 1997, 'XkB_0': 2526, 'DsXlR_0': 2094... }
+    # -- dt:  {('CHR', '0'): 681, ('Bie', '0'): 1997, ('XkB', '0'): 2526, ('DsXlR', '0'): 2094... }
     with open(input_file, 'r') as f:
         # One line at a time
         # >hap_0_5	f_164_ZpDL_LLR_R2f,f_182_ZpDL_LLR_R1f,f_1...
@@ -73,30 +76,21 @@ def generate_haplotype_table(input_file, output_file, locations):
             hap_index = hap_info.split('_')[1]
             # >hap_0_5 => 0
 
-            all_read_IDs = all_read_IDs.split(',')
-
-            if hap_index not in haplotypes:
-                haplotypes.append(hap_index)
+            haplotypes[hap_index] = None
 
-            for read_ID in all_read_IDs:
-                read_parts = read_ID.split('_')
-                if len(read_parts) >= 4:
-                    location = read_parts[3]
-                    # read_ID = f_164_ZpDL_LLR_R2f => location = LLR
+            # -- tally locations for the whole line in C (Counter), then merge once per location
+            # -- read_ID = f_164_ZpDL_LLR_R2f => location = LLR
+            read_parts = [read_ID.split('_', 4) for read_ID in all_read_IDs.split(',')]
+            location_counts = Counter([parts[3] for parts in read_parts if len(parts) >= 4])
 
-                    k = location + '_' + hap_index
-                    # k = LLR_0
-
-                    if k in dt:
-                        dt[k] += 1
-                    else:
-                        dt[k] = 1
+            for location, count in location_counts.items():
+                dt[(location, hap_index)] += count
     
     # print(f"Found haplotypes: {haplotypes}")
 
-    with open(output_file, 'w') as outfile:
-        header = 'locations,total,' + ','.join(haplotypes) + '\n'
-        outfile.write(header)
+    with open(output_file, 'w', buffering=1 << 20) as outfile:
+        # -- rows are collected and written in one call
+        rows = ['locations,total,' + ','.join(haplotypes)]
         
         total_in_reads = dict.fromkeys(haplotypes, 0)
 
@@ -104,25 +98,20 @@ def generate_haplotype_table(input_file, output_file, locations):
             total_in_loc = 0
             tmp = []
             for hap in haplotypes:
-                k = loc + '_' + hap
-                if k in dt:
-                    count = dt[k] # dt[k] => ex. dt[Bie_0] = 3 (count = 3)
-                    tmp.append(str(count))
-                    total_in_reads[hap] += count
-                    total_in_loc += count
-                else:
-                    tmp.append('0')
-
-            output_line = loc + ',' + str(total_in_loc) + ',' + ','.join(tmp)
-            outfile.write(output_line + '\n')
+                count = dt_get((loc, hap), 0) # ex. dt[('Bie', '0')] = 3 (count = 3)
+                tmp.append(str(count))
+                total_in_reads[hap] += count
+                total_in_loc += count
+
+            rows.append(loc + ',' + str(total_in_loc) + ',' + ','.join(tmp))
             # print(output_line)
 
         grand_total = sum(total_in_reads.values())
 
         total_in_reads_str = [str(count) for count in total_in_reads.values()]
         
-        total_line = 'total count,' + str(grand_total) + ',' + ','.join(total_in_reads_str)
-        outfile.write(total_line)
+        rows.append('total count,' + str(grand_total) + ',' + ','.join(total_in_reads_str))
+        outfile.write('\n'.join(rows))
     
     print(f"Output: {output_file.split('/')[-1]}", flush=True)
     print("-" * 50, flush=True)
@@ -136,8 +125,8 @@ if __name__ == "__main__":
     os.makedirs(output_dir, exist_ok=True)
 
     # -- get species
-    species_dirs = [d for d in os.listdir(input_dir) 
-                    if os.path.isdir(os.path.join(input_dir, d))]
+    with os.scandir(input_dir) as it:
+        species_dirs = [entry.name for entry in it if entry.is_dir()]
 
     # print("species_dirs:", species_dirs, flush=True)
     
@@ -12,33 +12,12 @@ import sys
 import json
 from pathlib import Path
 
+from Step1 import barcodes
+
 def detect_species(barcode_file: str) -> dict:
-    species_set = set()
-    
     try:
-        with open(barcode_file, 'r', encoding='utf-8') as f:
-            for line in f:
-                line = line.strip()
-                
-                if not line:
-                    continue
-                    
-                # 解析 CSV 行
-                fields = line.split(',')
-                if len(fields) >= 7:  # 確保有足夠的欄位
-                    location = fields[0]
-                    
-                    # 提取物種前綴（假設格式為 species_location）
-                    species_prefix = location.split('_')[0] if '_' in location else location
-                    
-                    # 添加到物種集合
-                    species_set.add(species_prefix)
-        
-        result = {
-            'species': sorted(list(species_set))
-        }
-        
-        return result
+        # 與 Step1 共用同一個條碼 CSV 解析器
+        return {'species': barcodes.detect_species(barcode_file)}
         
     except FileNotFoundError:
         return {'error': f'Barcode file not found: {barcode_file}'}
@@ -9,6 +9,9 @@ import { logger } from "../utils/logger.js";
 const router = express.Router();
 const pythonExecutor = new PythonExecutor();
 
+// Species detection results per barcode file, reused while its size and mtime are unchanged
+const speciesDetectionCache = new Map();
+
 const handleDockerError = (error) => {
   const errorMessage = error.message.toLowerCase();
   const errorStack = error.stack?.toLowerCase() || "";
@@ -88,6 +91,19 @@ router.post("/pipeline/detect-species", async (req, res) => {
       });
     }
 
+    // 條碼檔未變更時直接回傳先前的結果，不再啟動容器
+    const barcodeStat = await fs.stat(barcodeFilePath);
+    const cacheKey = `${barcodeStat.size}:${barcodeStat.mtimeMs}`;
+    const cached = speciesDetectionCache.get(barcodeFilePath);
+    if (cached && cached.key === cacheKey) {
+      logger.info(`Using cached species detection for: ${barcodeFile}`);
+      return res.json({
+        success: true,
+        data: cached.data,
+        message: `Successfully detected ${cached.data.species.length} species`,
+      });
+    }
+
     logger.info(`Starting species detection for: ${barcodeFile}`);
 
     let result;
@@ -155,6 +171,10 @@ router.post("/pipeline/detect-species", async (req, res) => {
     logger.info(
       `Species detection completed. Found ${speciesData.species.length} species`
     );
+    speciesDetectionCache.set(barcodeFilePath, {
+      key: cacheKey,
+      data: speciesData,
+    });
 
     // Returns successful result
     res.json({
@@ -42,7 +42,7 @@ export class PythonExecutor {
         name: "trim and rename",
         script: "Step1/rename_trim.py",
         requiredFiles: ["R1", "R2", "barcode", "qualityConfig"],
-        outputDirs: ["rename", "trim"],
+        outputDirs: ["trim"],
       },
       {
         name: "pear",
@@ -80,12 +80,6 @@ export class PythonExecutor {
         requiredFiles: [],
         outputDirs: ["mafft"],
       },
-      {
-        name: "tab formatter",
-        script: "Step4/tabFormatter.py",
-        requiredFiles: [],
-        outputDirs: ["tab_formatter"],
-      },
       {
         name: "trim gaps",
         script: "Step4/trim_gaps.py",